@@ -12,7 +12,10 @@ installed. This can be done by running:
     pip install vantage6-algorithm-tools
 """
 
+import importlib
 import os
+from types import SimpleNamespace
+
 import pytest
 import pandas as pd
 import numpy as np
@@ -24,67 +27,69 @@ from vantage6.algorithm.tools.exceptions import (
     InputError,
 )
 
-# Create fake data. Three columns with random numbers, two columns with factors
-np.random.seed(123)
+# the package name contains hyphens, so it cannot be imported with an import statement
+central = importlib.import_module("v6-summary-py.central")
+
 columns = ["A", "B", "C", "D", "E", "F"]
 size = 1000
+size_per_df = int(size / 2)
 
-data = pd.DataFrame(
-    {
-        "A": np.random.choice(range(1, 11), size=size, replace=True),
-        "B": np.random.choice([1, 2, 3, np.nan], size=size, replace=True),
-        "C": np.random.choice(list(range(6, 20)) + [np.nan], size=size, replace=True),
-        "D": np.random.choice(["1", "2", "3", "4"], size=size, replace=True),
-        "E": np.random.choice(["female", "male", None], size=size, replace=True),
-        "F": np.random.choice(["other"], size=size, replace=True),
-    }
-)
 
-# Split the dataframe into two sets
-n_rows = len(data)
-size_per_df = int(size / 2)
+@pytest.fixture(scope="session")
+def mock_env() -> SimpleNamespace:
+    """Create fake data for two organizations and a mock client to run tasks on it"""
+    # Create fake data. Three columns with random numbers, three columns with factors
+    rng = np.random.default_rng(123)
+    data = pd.DataFrame(
+        {
+            "A": rng.choice(np.arange(1, 11), size=size),
+            "B": rng.choice(np.array([1, 2, 3, np.nan]), size=size),
+            "C": rng.choice(np.append(np.arange(6, 20), np.nan), size=size),
+            "D": rng.choice(np.array(["1", "2", "3", "4"], dtype=object), size=size),
+            "E": rng.choice(
+                np.array(["female", "male", None], dtype=object), size=size
+            ),
+            "F": rng.choice(np.array(["other"], dtype=object), size=size),
+        }
+    )
 
-df1 = data.iloc[:size_per_df, :]
-df2 = data.iloc[size_per_df:, :]
-
-## Mock client
-client = MockAlgorithmClient(
-    datasets=[
-        # Data for first organization
-        [
-            {
-                "database": df1,
-            }
-        ],
-        # Data for second organization
-        [
-            {
-                "database": df2,
-            }
+    # Split the dataframe into two sets
+    df1 = data.iloc[:size_per_df, :]
+    df2 = data.iloc[size_per_df:, :]
+
+    ## Mock client
+    client = MockAlgorithmClient(
+        datasets=[
+            # Data for first organization
+            [
+                {
+                    "database": df1,
+                }
+            ],
+            # Data for second organization
+            [
+                {
+                    "database": df2,
+                }
+            ],
         ],
-    ],
-    module="v6-summary-py",
-)
+        module="v6-summary-py",
+    )
 
-# list mock organizations
-organizations = client.organization.list()
-org_ids = [organization["id"] for organization in organizations]
+    # list mock organizations
+    organizations = client.organization.list()
+    org_ids = [organization["id"] for organization in organizations]
 
+    return SimpleNamespace(data=data, df1=df1, df2=df2, client=client, org_ids=org_ids)
 
-central_task = client.task.create(
-    input_={
-        "method": "summary",
-        "kwargs": {
-            "columns": columns,
-        },
-    },
-    organizations=[org_ids[0]],
-)
-results = client.wait_for_results(central_task.get("id"))
 
-
-def test_central_all_columns():
+def test_central_all_columns(mock_env):
     """test central method on all columns"""
+    data = mock_env.data
+    df1 = mock_env.df1
+    df2 = mock_env.df2
+    client = mock_env.client
+    org_ids = mock_env.org_ids
     central_task = client.task.create(
         input_={
             "method": "summary",
@@ -119,9 +124,9 @@ def test_central_all_columns():
     assert numeric_results["A"]["mean"] == data["A"].mean()
     assert numeric_results["B"]["mean"] == data["B"].mean()
     assert numeric_results["C"]["mean"] == data["C"].mean()
-    assert numeric_results["A"]["std"] == data["A"].std()
-    assert numeric_results["B"]["std"] == data["B"].std()
-    assert numeric_results["C"]["std"] == data["C"].std()
+    assert numeric_results["A"]["std"] == pytest.approx(data["A"].std())
+    assert numeric_results["B"]["std"] == pytest.approx(data["B"].std())
+    assert numeric_results["C"]["std"] == pytest.approx(data["C"].std())
     categorical_results = results[0]["categorical"]
     assert categorical_results["D"]["count"] == data["D"].count()
     assert categorical_results["E"]["count"] == data["E"].count()
@@ -143,8 +148,13 @@ def test_central_all_columns():
     )
 
 
-def test_central_single_numeric_column():
+def test_central_single_numeric_column(mock_env):
     """ensure that we can run a task for a single numeric column"""
+    data = mock_env.data
+    df1 = mock_env.df1
+    df2 = mock_env.df2
+    client = mock_env.client
+    org_ids = mock_env.org_ids
     task = client.task.create(
         input_={
             "method": "summary",
@@ -166,8 +176,13 @@ def test_central_single_numeric_column():
     assert results[0]["num_complete_rows_per_node"][1] == df2["A"].dropna().shape[0]
 
 
-def test_central_single_categorical_column():
+def test_central_single_categorical_column(mock_env):
     """ensure that we can run a task for a single categorical column"""
+    data = mock_env.data
+    df1 = mock_env.df1
+    df2 = mock_env.df2
+    client = mock_env.client
+    org_ids = mock_env.org_ids
     task = client.task.create(
         input_={
             "method": "summary",
@@ -191,8 +206,10 @@ def test_central_single_categorical_column():
     assert results[0]["num_complete_rows_per_node"][1] == df2["E"].dropna().shape[0]
 
 
-def test_central_non_existing_column():
+def test_central_non_existing_column(mock_env):
     """check that non-existing columns give an error"""
+    client = mock_env.client
+    org_ids = mock_env.org_ids
     with pytest.raises(InputError):
         client.task.create(
             input_={
@@ -205,8 +222,10 @@ def test_central_non_existing_column():
         )
 
 
-def test_partial_non_existing_column():
+def test_partial_non_existing_column(mock_env):
     """Test that non-existing columns give an error"""
+    client = mock_env.client
+    org_ids = mock_env.org_ids
     with pytest.raises(InputError):
         client.task.create(
             input_={
@@ -219,10 +238,68 @@ def test_partial_non_existing_column():
         )
 
 
-def test_privacy_threshold_categorical():
+def test_partial_non_existing_columns_mixed_types(mock_env):
+    """Test that non-existing column labels of mixed types give an input error"""
+    client = mock_env.client
+    org_ids = mock_env.org_ids
+    with pytest.raises(InputError, match=r"\[1, 'x'\]"):
+        client.task.create(
+            input_={
+                "method": "summary_per_data_station",
+                "kwargs": {
+                    "columns": ["A", 1, "x"],
+                },
+            },
+            organizations=[org_ids[0]],
+        )
+
+
+def test_disallowed_columns(mock_env):
+    """Test that columns the node administrator disallows cannot be requested"""
+    client = mock_env.client
+    org_ids = mock_env.org_ids
+    os.environ["SUMMARY_DISALLOWED_COLUMNS"] = "A, C"
+    try:
+        with pytest.raises(ValueError, match=r"\['A', 'C'\]"):
+            client.task.create(
+                input_={
+                    "method": "summary_per_data_station",
+                    "kwargs": {
+                        "columns": ["A", "B", "C"],
+                    },
+                },
+                organizations=[org_ids[0]],
+            )
+    finally:
+        del os.environ["SUMMARY_DISALLOWED_COLUMNS"]
+
+
+def test_malformed_allowed_columns(mock_env):
+    """Test that an allow-list without column names blocks all columns"""
+    client = mock_env.client
+    org_ids = mock_env.org_ids
+    os.environ["SUMMARY_ALLOWED_COLUMNS"] = ","
+    try:
+        with pytest.raises(ValueError, match=r"\['A'\]"):
+            client.task.create(
+                input_={
+                    "method": "summary_per_data_station",
+                    "kwargs": {
+                        "columns": ["A"],
+                    },
+                },
+                organizations=[org_ids[0]],
+            )
+    finally:
+        del os.environ["SUMMARY_ALLOWED_COLUMNS"]
+
+
+def test_privacy_threshold_categorical(mock_env):
     """Test that counts of unique values in a categorical column are not returned if the
     privacy threshold is violated
     """
+    client = mock_env.client
+    org_ids = mock_env.org_ids
     os.environ["SUMMARY_PRIVACY_THRESHOLD"] = "1000"
     task = client.task.create(
         input_={
@@ -238,8 +315,134 @@ def test_privacy_threshold_categorical():
     assert results[0]["counts_unique_values"]["D"] == {}
 
 
-def test_convert_categorical_to_numeric():
+def test_counts_unique_values_not_allowed(mock_env):
+    """Test that the summary is aggregated if the nodes do not allow sharing the
+    counts of unique values
+    """
+    data = mock_env.data
+    client = mock_env.client
+    org_ids = mock_env.org_ids
+    os.environ["SUMMARY_ALLOW_COUNTS_UNIQUE_VALUES"] = "false"
+    try:
+        task = client.task.create(
+            input_={
+                "method": "summary",
+                "kwargs": {
+                    "columns": ["D"],
+                },
+            },
+            organizations=[org_ids[0]],
+        )
+        results = client.wait_for_results(task.get("id"))
+    finally:
+        del os.environ["SUMMARY_ALLOW_COUNTS_UNIQUE_VALUES"]
+    assert results[0]["counts_unique_values"] == {}
+    assert results[0]["categorical"]["D"]["count"] == data["D"].count()
+
+
+def test_counts_unique_values_not_shared_by_all_nodes():
+    """Test that counts of unique values are not aggregated if some nodes do not share
+    them
+    """
+    partial_results = [
+        {
+            "numeric": {},
+            "categorical": {"D": {"count": 10, "missing": 0}},
+            "num_complete_rows_per_node": 10,
+            "counts_unique_values": {"D": {"1": 6, "2": 4}},
+        },
+        {
+            "numeric": {},
+            "categorical": {"D": {"count": 8, "missing": 2}},
+            "num_complete_rows_per_node": 8,
+            "counts_unique_values": None,
+        },
+    ]
+    results = central._aggregate_partial_summaries(partial_results)
+    assert results["counts_unique_values"] == {}
+    assert results["categorical"]["D"] == {"count": 18, "missing": 2}
+
+
+def test_statistic_not_shared_by_first_node(capsys):
+    """Test that a statistic is not aggregated, with a warning, if the first node does
+    not share it
+    """
+    partial_results = [
+        {
+            "numeric": {"A": {"count": 10, "sum": 50, "max": 9}},
+            "categorical": {},
+            "num_complete_rows_per_node": 10,
+            "counts_unique_values": {},
+        },
+        {
+            "numeric": {"A": {"count": 8, "sum": 40, "min": 1, "max": 8}},
+            "categorical": {},
+            "num_complete_rows_per_node": 8,
+            "counts_unique_values": {},
+        },
+    ]
+    results = central._aggregate_partial_summaries(partial_results)
+    assert "Not aggregating min of numeric columns" in capsys.readouterr().out
+    assert "min" not in results["numeric"]["A"]
+    assert results["numeric"]["A"]["max"] == 9
+    assert results["numeric"]["A"]["mean"] == 5
+
+
+def test_variance_not_allowed(mock_env):
+    """Test that the standard deviation is not returned if the nodes do not allow
+    sharing the variance
+    """
+    data = mock_env.data
+    client = mock_env.client
+    org_ids = mock_env.org_ids
+    os.environ["SUMMARY_ALLOW_VARIANCE"] = "false"
+    try:
+        task = client.task.create(
+            input_={
+                "method": "summary",
+                "kwargs": {
+                    "columns": ["A"],
+                },
+            },
+            organizations=[org_ids[0]],
+        )
+        results = client.wait_for_results(task.get("id"))
+    finally:
+        del os.environ["SUMMARY_ALLOW_VARIANCE"]
+    assert "std" not in results[0]["numeric"]["A"]
+    assert results[0]["numeric"]["A"]["mean"] == data["A"].mean()
+
+
+def test_partial_statistic_not_allowed(mock_env):
+    """Test that statistics the node administrator disallows are not shared"""
+    data = mock_env.data
+    client = mock_env.client
+    org_ids = mock_env.org_ids
+    os.environ["SUMMARY_ALLOW_MIN"] = "false"
+    try:
+        task = client.task.create(
+            input_={
+                "method": "summary_per_data_station",
+                "kwargs": {
+                    "columns": ["A"],
+                },
+            },
+            organizations=[org_ids[0]],
+        )
+        results = client.wait_for_results(task.get("id"))
+    finally:
+        del os.environ["SUMMARY_ALLOW_MIN"]
+    assert "min" not in results[0]["numeric"]["A"]
+    assert results[0]["numeric"]["A"]["max"] == data["A"].iloc[:size_per_df].max()
+
+
+def test_convert_categorical_to_numeric(mock_env):
     """Test that we can convert a categorical column to a numeric column"""
+    data = mock_env.data
+    df1 = mock_env.df1
+    df2 = mock_env.df2
+    client = mock_env.client
+    org_ids = mock_env.org_ids
     # note that column D is a categorical column that consists of "1", "2", "3", "4"
     # so it should be convertible to a numeric column
     central_task = client.task.create(
@@ -265,8 +468,59 @@ def test_convert_categorical_to_numeric():
     assert results[0]["num_complete_rows_per_node"][1] == df2["D"].dropna().shape[0]
 
 
-def test_partial_all_columns():
+def test_convert_empty_strings_to_numeric():
+    """Test that empty strings are treated as missing values when casting a column
+    to numeric
+    """
+    data = pd.DataFrame({"G": ["1", "2", "", "3", "4", "5", ""]})
+    client = MockAlgorithmClient(
+        datasets=[[{"database": data}]], module="v6-summary-py"
+    )
+    org_ids = [organization["id"] for organization in client.organization.list()]
+    task = client.task.create(
+        input_={
+            "method": "summary_per_data_station",
+            "kwargs": {
+                "columns": ["G"],
+                "is_numeric": [True],
+            },
+        },
+        organizations=org_ids,
+    )
+    results = client.wait_for_results(task.get("id"))
+    assert results[0]["numeric"]["G"]["count"] == 5
+    assert results[0]["numeric"]["G"]["missing"] == 2
+    assert results[0]["numeric"]["G"]["sum"] == 15
+
+
+def test_boolean_column_as_numeric():
+    """Test that a boolean column is summarized as numeric if requested"""
+    data = pd.DataFrame({"H": [True, False, True, True, False, True]})
+    client = MockAlgorithmClient(
+        datasets=[[{"database": data}]], module="v6-summary-py"
+    )
+    org_ids = [organization["id"] for organization in client.organization.list()]
+    task = client.task.create(
+        input_={
+            "method": "summary_per_data_station",
+            "kwargs": {
+                "columns": ["H"],
+                "is_numeric": [True],
+            },
+        },
+        organizations=org_ids,
+    )
+    results = client.wait_for_results(task.get("id"))
+    assert results[0]["categorical"] == {}
+    assert results[0]["numeric"]["H"]["count"] == 6
+    assert results[0]["numeric"]["H"]["sum"] == 4
+
+
+def test_partial_all_columns(mock_env):
     """Verify results from partial task"""
+    data = mock_env.data
+    client = mock_env.client
+    org_ids = mock_env.org_ids
     task = client.task.create(
         input_={
             "method": "summary_per_data_station",
@@ -303,6 +557,10 @@ def test_partial_all_columns():
         assert numeric_results["A"]["sum"] == check_df["A"].sum()
         assert numeric_results["B"]["sum"] == check_df["B"].sum()
         assert numeric_results["C"]["sum"] == check_df["C"].sum()
+        for col in ["A", "B", "C"]:
+            assert numeric_results[col]["sum_squared_deviations"] == pytest.approx(
+                ((check_df[col] - check_df[col].mean()) ** 2).sum()
+            )
 
         categorical_results = results[node_idx]["categorical"]
         assert categorical_results["D"]["count"] == check_df["D"].count()
@@ -334,3 +592,31 @@ def test_partial_all_columns():
         assert counts_unique_values["F"]["other"] == check_df["F"].value_counts().get(
             "other", 0
         )
+
+
+def test_partial_variance(mock_env):
+    """Verify the sum of squared deviations from the given means per node"""
+    data = mock_env.data
+    client = mock_env.client
+    org_ids = mock_env.org_ids
+    means = [data["A"].mean(), data["B"].mean()]
+    task = client.task.create(
+        input_={
+            "method": "variance_per_data_station",
+            "kwargs": {
+                "columns": ["A", "B"],
+                "means": means,
+            },
+        },
+        organizations=org_ids,
+    )
+    results = client.wait_for_results(task.get("id"))
+
+    for node_idx in [0, 1]:
+        check_df = data.iloc[size_per_df * node_idx : size_per_df * (node_idx + 1)]
+        assert results[node_idx]["A"] == pytest.approx(
+            ((check_df["A"] - means[0]) ** 2).sum()
+        )
+        assert results[node_idx]["B"] == pytest.approx(
+            ((check_df["B"] - means[1]) ** 2).sum()
+        )
@@ -6,13 +6,20 @@ The results in a return statement are sent to the vantage6 server (after
 encryption if that is enabled).
 """
 
+from collections import Counter
 from typing import Any
 
-from vantage6.algorithm.tools.util import info
+import numpy as np
+
+from vantage6.algorithm.tools.util import info, warn
 from vantage6.algorithm.tools.decorators import algorithm_client
 from vantage6.algorithm.tools.exceptions import AlgorithmExecutionError, InputError
 from vantage6.algorithm.client import AlgorithmClient
 
+# ufunc reductions to aggregate statistics over the nodes. Statistics that are not
+# listed here are aggregated by summing them
+_REDUCTIONS = {"min": np.minimum.reduce, "max": np.maximum.reduce}
+
 
 @algorithm_client
 def summary(
@@ -75,29 +82,11 @@ def summary(
     results = client.wait_for_results(task_id=task.get("id"))
     info("Results obtained!")
 
-    # aggregate the partial summaries of all nodes
+    # aggregate the partial summaries of all nodes. As the nodes share their sum of
+    # squared deviations alongside the count and sum, the standard deviation can be
+    # computed without a second round of partial tasks
     results = _aggregate_partial_summaries(results)
 
-    # compute the variance now that we have the mean
-    numerical_columns = list(results["numeric"].keys())
-    means = [results["numeric"][column]["mean"] for column in numerical_columns]
-    task = client.task.create(
-        input_={
-            "method": "variance_per_data_station",
-            "kwargs": {
-                "columns": numerical_columns,
-                "means": means,
-            },
-        },
-        organizations=organizations_to_include,
-        name="Subtask variance",
-        description="Compute variance per data station",
-    )
-    variance_results = client.wait_for_results(task_id=task.get("id"))
-
-    # add the standard deviation to the results
-    results = _add_sd_to_results(results, variance_results, numerical_columns)
-
     # return the final results of the algorithm
     return results
 
@@ -111,90 +100,158 @@ def _aggregate_partial_summaries(results: list[dict]) -> dict:
         The partial summaries of all nodes.
     """
     info("Aggregating partial summaries")
-    aggregated_summary = {}
-    is_first = True
-    for result in results:
-        if result is None:
-            raise AlgorithmExecutionError(
-                "At least one of the nodes returned invalid result. Please check the "
-                "logs."
-            )
-        if is_first:
-            # copy results. Only convert num complete rows per node to a list so that
-            # we can add the other nodes to it later
-            aggregated_summary = result
-            aggregated_summary["num_complete_rows_per_node"] = [
-                result["num_complete_rows_per_node"]
-            ]
-            is_first = False
-            continue
+    if not results:
+        raise AlgorithmExecutionError(
+            "None of the nodes returned a result. Please check the logs."
+        )
+    if any(result is None for result in results):
+        raise AlgorithmExecutionError(
+            "At least one of the nodes returned invalid result. Please check the "
+            "logs."
+        )
 
-        # aggregate data for numeric colums
-        for column in result["numeric"]:
-            aggregated_dict = aggregated_summary["numeric"][column]
-            aggregated_dict["count"] += result["numeric"][column]["count"]
-            aggregated_dict["min"] = min(
-                aggregated_summary["numeric"][column]["min"],
-                result["numeric"][column]["min"],
+    # aggregate data for numeric columns. The sums of squared deviations are
+    # combined with the parallel algorithm of Chan et al.: the within-node sums are
+    # added to the squared deviations of the node means from the global mean
+    numeric_columns, numeric = _stack_statistics(results, "numeric")
+    aggregated_numeric = {
+        statistic: _REDUCTIONS.get(statistic, np.add.reduce)(values, axis=0)
+        for statistic, values in numeric.items()
+        if statistic != "sum_squared_deviations"
+    }
+    if "count" in numeric and "sum" in numeric:
+        aggregated_numeric["mean"] = (
+            aggregated_numeric["sum"] / aggregated_numeric["count"]
+        )
+        if "sum_squared_deviations" in numeric:
+            node_means = numeric["sum"] / numeric["count"]
+            between_nodes = (
+                numeric["count"] * (node_means - aggregated_numeric["mean"]) ** 2
             )
-            aggregated_dict["max"] = max(
-                aggregated_summary["numeric"][column]["max"],
-                result["numeric"][column]["max"],
+            sum_squared_deviations = (
+                numeric["sum_squared_deviations"] + between_nodes
+            ).sum(axis=0)
+            aggregated_numeric["std"] = np.sqrt(
+                sum_squared_deviations / (aggregated_numeric["count"] - 1)
             )
-            aggregated_dict["missing"] += result["numeric"][column]["missing"]
-            aggregated_dict["sum"] += result["numeric"][column]["sum"]
-
-        # aggregate data for categorical columns
-        for column in result["categorical"]:
-            aggregated_dict = aggregated_summary["categorical"][column]
-            aggregated_dict["count"] += result["categorical"][column]["count"]
-            aggregated_dict["missing"] += result["categorical"][column]["missing"]
-
-        # add the number of complete rows for this node
-        aggregated_summary["num_complete_rows_per_node"].append(
-            result["num_complete_rows_per_node"]
-        )
 
-        # add the unique values
-        for column in result["counts_unique_values"]:
-            if column not in aggregated_summary["counts_unique_values"]:
-                aggregated_summary["counts_unique_values"][column] = {}
-            for value, count in result["counts_unique_values"][column].items():
-                if value not in aggregated_summary["counts_unique_values"][column]:
-                    aggregated_summary["counts_unique_values"][column][value] = 0
-                aggregated_summary["counts_unique_values"][column][value] += count
+    # aggregate data for categorical columns
+    categorical_columns, categorical = _stack_statistics(results, "categorical")
+    aggregated_categorical = {
+        statistic: values.sum(axis=0) for statistic, values in categorical.items()
+    }
 
-    # now that all data is aggregated, we can compute the mean
-    for column in aggregated_summary["numeric"]:
-        aggregated_dict = aggregated_summary["numeric"][column]
-        aggregated_dict["mean"] = aggregated_dict["sum"] / aggregated_dict["count"]
+    aggregated_summary = {
+        "numeric": _unstack_statistics(numeric_columns, aggregated_numeric),
+        "categorical": _unstack_statistics(categorical_columns, aggregated_categorical),
+        "num_complete_rows_per_node": [
+            result["num_complete_rows_per_node"] for result in results
+        ],
+        "counts_unique_values": _aggregate_counts_unique_values(results),
+    }
 
     return aggregated_summary
 
 
-def _add_sd_to_results(
-    results: dict, variance_results: list[dict], numerical_columns: list[str]
-) -> dict:
-    """Add the variance to the results.
+def _aggregate_counts_unique_values(results: list[dict]) -> dict[str, dict]:
+    """Add up the counts of the unique values of all nodes.
 
     Parameters
     ----------
-    results : dict
-        The results of the summary task.
-    variance_results : list[dict]
-        The variance results of all nodes.
-    numerical_columns : list[str]
-        The numerical columns.
+    results : list[dict]
+        The partial summaries of all nodes.
 
     Returns
     -------
-    dict
-        The results with the variance added.
+    dict[str, dict]
+        The total count of each unique value per column. Columns for which not all
+        nodes shared the counts are left out.
     """
-    for column in numerical_columns:
-        sum_variance = 0
-        for node_results in variance_results:
-            sum_variance += node_results[column]
-        variance = sum_variance / (results["numeric"][column]["count"] - 1)
-        results["numeric"][column]["std"] = variance**0.5
-    return results
+    # nodes that do not allow sharing the counts of unique values return None
+    counts_per_node = [result["counts_unique_values"] or {} for result in results]
+    columns = dict.fromkeys(
+        column for counts_node in counts_per_node for column in counts_node
+    )
+    counts = {}
+    for column in columns:
+        if not all(column in counts_node for counts_node in counts_per_node):
+            warn(
+                f"Not aggregating counts of unique values of column {column} as not "
+                "all nodes shared them."
+            )
+            continue
+        counter = Counter()
+        for counts_node in counts_per_node:
+            counter.update(counts_node[column])
+        counts[column] = dict(counter)
+    return counts
+
+
+def _stack_statistics(
+    results: list[dict], group: str
+) -> tuple[list[str], dict[str, np.ndarray]]:
+    """Stack the statistics of all nodes into arrays.
+
+    Parameters
+    ----------
+    results : list[dict]
+        The partial summaries of all nodes.
+    group : str
+        The group of columns to stack the statistics for, either "numeric" or
+        "categorical".
+
+    Returns
+    -------
+    tuple[list[str], dict[str, np.ndarray]]
+        The columns and, per statistic, an array of shape (n_nodes, n_columns).
+        Statistics that are not shared by all nodes are left out.
+    """
+    columns = list(results[0][group])
+    if not columns:
+        return columns, {}
+    # collect the statistics of all nodes, so that a statistic that only some nodes
+    # shared is reported regardless of the order of the nodes
+    statistics = dict.fromkeys(
+        statistic for result in results for statistic in result[group][columns[0]]
+    )
+    stacked = {}
+    for statistic in statistics:
+        if not all(statistic in result[group][columns[0]] for result in results):
+            warn(
+                f"Not aggregating {statistic} of {group} columns as not all nodes "
+                "shared it."
+            )
+            continue
+        stacked[statistic] = np.array(
+            [
+                [result[group][column][statistic] for column in columns]
+                for result in results
+            ]
+        )
+    return columns, stacked
+
+
+def _unstack_statistics(
+    columns: list[str], aggregated: dict[str, np.ndarray]
+) -> dict[str, dict]:
+    """Convert aggregated statistics arrays back to a dictionary per column.
+
+    Parameters
+    ----------
+    columns : list[str]
+        The columns in the order of the arrays.
+    aggregated : dict[str, np.ndarray]
+        Per statistic, an array with the aggregated value of each column.
+
+    Returns
+    -------
+    dict[str, dict]
+        The aggregated statistics per column.
+    """
+    aggregated = {
+        statistic: values.tolist() for statistic, values in aggregated.items()
+    }
+    return {
+        column: {statistic: values[idx] for statistic, values in aggregated.items()}
+        for idx, column in enumerate(columns)
+    }
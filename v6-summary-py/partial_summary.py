@@ -7,17 +7,20 @@ encryption if that is enabled). From there, they are sent to the partial task
 or directly to the user (if they requested partial results).
 """
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
 
-from vantage6.algorithm.tools.util import info, warn, get_env_var
+from vantage6.algorithm.tools.util import info, warn
 from vantage6.algorithm.tools.decorators import data
-from vantage6.algorithm.tools.exceptions import InputError
-from .globals import (
-    DEFAULT_PRIVACY_THRESHOLD,
-    ENVVAR_PRIVACY_THRESHOLD,
-    EnvVarsAllowed,
+from .utils import (
+    Policy,
+    check_columns_exist,
+    check_privacy,
+    check_match_inferred_is_numeric,
+    get_policy,
+    to_float_array,
 )
-from .utils import check_privacy, check_match_inferred_is_numeric
 
 
 @data(1)
@@ -59,21 +62,21 @@ def _summary_per_data_station(
         columns = df.columns
 
     # Check that column names exist in the dataframe
-    if not all([col in df.columns for col in columns]):
-        non_existing_columns = [col for col in columns if col not in df.columns]
-        raise InputError(
-            f"Columns {non_existing_columns} do not exist in the dataframe"
-        )
+    check_columns_exist(df, columns)
 
     # filter dataframe to only include the columns of interest
     df = df[columns]
 
     # Check privacy settings
     info("Checking if data complies to privacy settings")
-    check_privacy(df, columns)
+    policy = get_policy()
+    check_privacy(df, columns, policy)
 
-    # Split the data in numeric and non-numeric columns
-    inferred_is_numeric = [df[col].dtype in [int, float] for col in df.columns]
+    # Split the data in numeric and non-numeric columns. Booleans are considered to be
+    # categorical
+    inferred_is_numeric = [
+        is_numeric_dtype(dtype) and not is_bool_dtype(dtype) for dtype in df.dtypes
+    ]
     if is_numeric is None:
         is_numeric = inferred_is_numeric
     else:
@@ -81,45 +84,41 @@ def _summary_per_data_station(
             is_numeric, inferred_is_numeric, columns, df
         )
 
-    # set numeric and non-numeric columns
-    numeric_columns = [col for col, is_num in zip(columns, is_numeric) if is_num]
-    non_numeric_columns = [
-        col for col, is_num in zip(columns, is_numeric) if not is_num
-    ]
-    df_numeric = df[numeric_columns]
-    df_non_numeric = df[non_numeric_columns]
+    # set numeric and non-numeric columns. Partition on the validated flags rather
+    # than on the data types, as boolean columns may be requested as numeric
+    is_numeric = np.asarray(is_numeric, dtype=bool)
+    df_numeric = df.loc[:, is_numeric]
+    df_non_numeric = df.loc[:, ~is_numeric]
 
-    # compute data summary for numeric columns
-    summary_numeric = pd.DataFrame()
+    # compute data summary for numeric columns. Only compute the statistics that are
+    # allowed to be shared
+    statistics = _get_allowed_statistics(policy)
+    summary_numeric = {}
     if not df_numeric.empty:
-        summary_numeric = _get_numeric_summary(df_numeric)
+        summary_numeric = _get_numeric_summary(df_numeric, statistics)
 
     # compute data summary for non-numeric columns. Also compute the counts of the
     # unique values in the non-numeric columns (if they meet the privacy threshold)
-    summary_categorical = pd.DataFrame()
+    summary_categorical = {}
     counts_unique_values = {}
     if not df_non_numeric.empty:
         summary_categorical = _get_categorical_summary(df_non_numeric)
-        counts_unique_values = _get_counts_unique_values(df_non_numeric)
+        counts_unique_values = _get_counts_unique_values(
+            df_non_numeric, policy.privacy_threshold
+        )
 
-    # count complete rows without missing values
-    num_complete_rows_per_node = len(df.dropna())
+    # count complete rows without missing values. Use a row mask rather than
+    # dropna(), which would copy all complete rows just to count them
+    num_complete_rows_per_node = int(df.notna().all(axis=1).sum())
 
     # filter out the variables that are not allowed to be shared
-    summary_numeric, summary_categorical = _filter_results(
-        summary_numeric, summary_categorical
-    )
-    if not get_env_var(
-        EnvVarsAllowed.ALLOW_NUM_COMPLETE_ROWS.value, default="true", as_type="bool"
-    ):
+    if not policy.allow_num_complete_rows:
         warn(
             "Removing number of complete rows from summary as policies do not "
             "allow sharing it."
         )
         num_complete_rows_per_node = None
-    if not get_env_var(
-        EnvVarsAllowed.ALLOW_COUNTS_UNIQUE_VALUES.value, default="true", as_type="bool"
-    ):
+    if not policy.allow_counts_unique_values:
         warn(
             "Removing counts of unique values from summary as policies do not "
             "allow sharing it."
@@ -127,14 +126,14 @@ def _summary_per_data_station(
         counts_unique_values = None
 
     return {
-        "numeric": summary_numeric.to_dict(),
-        "categorical": summary_categorical.to_dict(),
+        "numeric": summary_numeric,
+        "categorical": summary_categorical,
         "num_complete_rows_per_node": num_complete_rows_per_node,
         "counts_unique_values": counts_unique_values,
     }
 
 
-def _get_numeric_summary(df: pd.DataFrame) -> pd.DataFrame:
+def _get_numeric_summary(df: pd.DataFrame, statistics: list[str]) -> dict[str, dict]:
     """
     Compute the summary statistics for the numeric columns
 
@@ -142,15 +141,44 @@ def _get_numeric_summary(df: pd.DataFrame) -> pd.DataFrame:
     ----------
     df : pd.DataFrame
         The data to compute the summary statistics for
+    statistics : list[str]
+        The statistics to compute
+
+    Returns
+    -------
+    dict[str, dict]
+        The summary statistics per column
     """
-    summary_numeric = df.describe(include=[int, float], percentiles=[])
-    summary_numeric.loc["missing"] = df.isna().sum()
-    summary_numeric.loc["sum"] = df.sum()
-    summary_numeric.drop(["50%", "mean", "std"], inplace=True)
-    return summary_numeric
+    # compute all statistics from a single float array, instead of separate pandas
+    # reductions that each traverse the data. The count is always computed, as it is
+    # also needed for the sum of squared deviations
+    values = to_float_array(df)
+    missing = np.isnan(values).sum(axis=0)
+    count = len(values) - missing
+    computed = {"count": count, "missing": missing}
+    if "min" in statistics:
+        computed["min"] = np.nanmin(values, axis=0)
+    if "max" in statistics:
+        computed["max"] = np.nanmax(values, axis=0)
+    if "sum" in statistics or "sum_squared_deviations" in statistics:
+        computed["sum"] = np.nansum(values, axis=0)
+    if "sum_squared_deviations" in statistics:
+        # share the sum of squared deviations from the local mean, so that the
+        # aggregator can combine the variances of all nodes without a second round of
+        # partial tasks
+        computed["sum_squared_deviations"] = np.nansum(
+            (values - computed["sum"] / count) ** 2, axis=0
+        )
+    computed = {statistic: computed[statistic].tolist() for statistic in statistics}
+    return {
+        column: {
+            statistic: per_column[idx] for statistic, per_column in computed.items()
+        }
+        for idx, column in enumerate(df.columns)
+    }
 
 
-def _get_categorical_summary(df: pd.DataFrame) -> pd.DataFrame:
+def _get_categorical_summary(df: pd.DataFrame) -> dict[str, dict]:
     """
     Compute the summary statistics for the non-numeric columns
 
@@ -158,16 +186,23 @@ def _get_categorical_summary(df: pd.DataFrame) -> pd.DataFrame:
     ----------
     df : pd.DataFrame
         The data to compute the summary statistics for
+
+    Returns
+    -------
+    dict[str, dict]
+        The summary statistics per column
     """
-    # summary for non-numeric columns. Include the NA count and remove the values
-    # that we don't want to share
-    summary_categorical = df.describe(exclude=[int, float])
-    summary_categorical.loc["missing"] = df.isna().sum()
-    summary_categorical.drop(["top", "freq", "unique"], inplace=True)
-    return summary_categorical
+    # summary for non-numeric columns. Only compute the count and the NA count, as
+    # describe() would also compute the unique values, top and frequency, which we
+    # don't want to share
+    num_rows = len(df)
+    return {
+        column: {"count": count, "missing": num_rows - count}
+        for column, count in zip(df.columns, df.count().tolist())
+    }
 
 
-def _get_counts_unique_values(df: pd.DataFrame) -> dict:
+def _get_counts_unique_values(df: pd.DataFrame, privacy_threshold: int) -> dict:
     """
     Get the counts of the unique values in categorical columns
 
@@ -175,6 +210,8 @@ def _get_counts_unique_values(df: pd.DataFrame) -> dict:
     ----------
     df : pd.DataFrame
         The data to get the counts of the unique values for
+    privacy_threshold : int
+        The minimum frequency of a value to be shared
 
     Returns
     -------
@@ -182,22 +219,31 @@ def _get_counts_unique_values(df: pd.DataFrame) -> dict:
         The counts of the unique values
     """
     counts = {}
-    privacy_threshold = get_env_var(
-        ENVVAR_PRIVACY_THRESHOLD, default=DEFAULT_PRIVACY_THRESHOLD, as_type="int"
-    )
     for col in df.columns:
-        counts[col] = _mask_privacy(df[col].value_counts(), privacy_threshold, col)
+        # factorize the column to integer codes once and count these, which is much
+        # cheaper than hashing the (often object) values in value_counts(). Missing
+        # values get code -1 and are not counted
+        codes, unique_values = pd.factorize(df[col])
+        value_counts = np.bincount(codes[codes >= 0], minlength=len(unique_values))
+        counts[col] = _mask_privacy(unique_values, value_counts, privacy_threshold, col)
     return counts
 
 
-def _mask_privacy(counts: pd.Series, privacy_threshold: int, column: str) -> dict:
+def _mask_privacy(
+    unique_values: pd.Index,
+    counts: np.ndarray,
+    privacy_threshold: int,
+    column: str,
+) -> dict:
     """
-    Mask the values of a pandas series if the frequency is too low
+    Mask the counts of the unique values of a column if the frequency is too low
 
     Parameters
     ----------
-    counts : pd.Series
-        The counts of the unique values
+    unique_values : pd.Index
+        The unique values of the column
+    counts : np.ndarray
+        The counts of the unique values, in the same order as the unique values
     privacy_threshold : int
         The minimum frequency of a value to be shared
     column : str
@@ -205,11 +251,10 @@ def _mask_privacy(counts: pd.Series, privacy_threshold: int, column: str) -> dic
 
     Returns
     -------
-    pd.Series
-        The masked counts
+    dict
+        The counts per unique value, or an empty dictionary if they are masked
     """
-    num_low_counts = counts[counts < privacy_threshold].sum()
-    if num_low_counts > 0:
+    if (counts < privacy_threshold).any():
         # It may be possible to share ranges of values instead of the actual values,
         # but we need to be vary careful. E.g. if the dataframe length is 20 and we
         # have frequencies 2 and 18, masking 2 as 0-5 while sharing 18 and 20 is not
@@ -223,44 +268,40 @@ def _mask_privacy(counts: pd.Series, privacy_threshold: int, column: str) -> dic
             "All counts for this column will be masked."
         )
         return {}
-    return counts.to_dict()
+    return dict(zip(unique_values.tolist(), counts.tolist()))
 
 
-def _filter_results(
-    summary_numeric: pd.DataFrame, summary_categorical: pd.DataFrame
-) -> tuple[pd.DataFrame, pd.DataFrame]:
+def _get_allowed_statistics(policy: Policy) -> list[str]:
     """
-    Filter out the variables that are not allowed to be shared
+    Get the statistics of numeric columns that are allowed to be shared
 
     Parameters
     ----------
-    summary_numeric : pd.DataFrame
-        The summary statistics for the numeric columns
-    summary_categorical : pd.DataFrame
-        The summary statistics for the non-numeric columns
+    policy : Policy
+        The privacy policies of the node
 
     Returns
     -------
-    tuple[pd.DataFrame, pd.DataFrame]
-        The filtered summary statistics for the numeric and non-numeric columns
+    list[str]
+        The statistics that are allowed to be shared
     """
-    if not get_env_var(EnvVarsAllowed.ALLOW_MIN.value, default="true", as_type="bool"):
+    statistics = ["count", "min", "max", "missing", "sum", "sum_squared_deviations"]
+    if not policy.allow_min:
         warn("Removing minimum from summary as policies do not allow sharing it.")
-        summary_numeric.drop("min", inplace=True)
-    if not get_env_var(EnvVarsAllowed.ALLOW_MAX.value, default="true", as_type="bool"):
+        statistics.remove("min")
+    if not policy.allow_max:
         warn("Removing maximum from summary as policies do not allow sharing it.")
-        summary_numeric.drop("max", inplace=True)
-    if not get_env_var(
-        EnvVarsAllowed.ALLOW_COUNT.value, default="true", as_type="bool"
-    ):
+        statistics.remove("max")
+    if not policy.allow_count:
         warn("Removing count from summary as policies do not allow sharing it.")
-        summary_numeric.drop("count", inplace=True)
-    if not get_env_var(EnvVarsAllowed.ALLOW_SUM.value, default="true", as_type="bool"):
+        statistics.remove("count")
+    if not policy.allow_sum:
         warn("Removing sum from summary as policies do not allow sharing it.")
-        summary_numeric.drop("sum", inplace=True)
-    if not get_env_var(
-        EnvVarsAllowed.ALLOW_MISSING.value, default="true", as_type="bool"
-    ):
+        statistics.remove("sum")
+    if not policy.allow_missing:
         warn("Removing missing from summary as policies do not allow sharing it.")
-        summary_numeric.drop("missing", inplace=True)
-    return summary_numeric, summary_categorical
+        statistics.remove("missing")
+    if not policy.allow_variance:
+        warn("Removing variance from summary as policies do not allow sharing it.")
+        statistics.remove("sum_squared_deviations")
+    return statistics
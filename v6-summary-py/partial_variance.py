@@ -7,13 +7,19 @@ encryption if that is enabled). From there, they are sent to the partial task
 or directly to the user (if they requested partial results).
 """
 
+import numpy as np
 import pandas as pd
 
-from vantage6.algorithm.tools.util import info, error, get_env_var
+from vantage6.algorithm.tools.util import info, error
 from vantage6.algorithm.tools.decorators import data
 from vantage6.algorithm.tools.exceptions import InputError
-from .utils import check_privacy, cast_df_to_numeric
-from .globals import EnvVarsAllowed
+from .utils import (
+    cast_df_to_numeric,
+    check_columns_exist,
+    check_privacy,
+    get_policy,
+    to_float_array,
+)
 
 
 @data(1)
@@ -44,19 +50,14 @@ def variance_per_data_station(
 def _variance_per_data_station(
     df: pd.DataFrame, columns: list[str], means: list[float]
 ) -> dict:
-    if not get_env_var(
-        EnvVarsAllowed.ALLOW_VARIANCE.value, default="true", as_type="bool"
-    ):
+    policy = get_policy()
+    if not policy.allow_variance:
         error("Node policies do not allow sharing the variance.")
         return None
     # Check that column names exist in the dataframe - note that this check should
     # not be necessary if a user runs the central task as is has already been checked
     # in that case
-    if not all([col in df.columns for col in columns]):
-        non_existing_columns = [col for col in columns if col not in df.columns]
-        raise InputError(
-            f"Columns {non_existing_columns} do not exist in the dataframe"
-        )
+    check_columns_exist(df, columns)
     if len(columns) != len(means):
         raise InputError(
             "Length of columns list does not match the length of means list"
@@ -67,11 +68,11 @@ def _variance_per_data_station(
 
     # Check privacy settings
     info("Checking if data complies to privacy settings")
-    check_privacy(df, columns)
+    check_privacy(df, columns, policy)
 
     # Cast the columns to numeric
     try:
-        cast_df_to_numeric(df, columns)
+        df = cast_df_to_numeric(df, columns)
     except ValueError as exc:
         error(str(exc))
         error("Exiting algorithm...")
@@ -79,9 +80,9 @@ def _variance_per_data_station(
 
     # Calculate the variance
     info("Calculating variance")
-    variances = {}
-    for idx, column in enumerate(columns):
-        mean = means[idx]
-        variances[column] = ((df[column].astype(float) - mean) ** 2).sum()
-
-    return variances
+    values = to_float_array(df)
+    # subtract the means of all columns at once and square the deviations in place,
+    # so that only a single temporary array is allocated
+    deviations = values - np.asarray(means, dtype=np.float64)
+    np.square(deviations, out=deviations)
+    return dict(zip(columns, np.nansum(deviations, axis=0).tolist()))
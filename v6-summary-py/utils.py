@@ -1,7 +1,11 @@
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_numeric_dtype
 
 from vantage6.algorithm.tools.util import get_env_var
-from vantage6.algorithm.tools.exceptions import PrivacyThresholdViolation
+from vantage6.algorithm.tools.exceptions import InputError, PrivacyThresholdViolation
 from .globals import (
     DEFAULT_MINIMUM_ROWS,
     DEFAULT_PRIVACY_THRESHOLD,
@@ -9,10 +13,102 @@ from .globals import (
     ENVVAR_DISALLOWED_COLUMNS,
     ENVVAR_MINIMUM_ROWS,
     ENVVAR_PRIVACY_THRESHOLD,
+    EnvVarsAllowed,
 )
 
 
-def check_privacy(df: pd.DataFrame, requested_columns: list[str]) -> None:
+@dataclass(frozen=True, slots=True)
+class Policy:
+    """Privacy policies set by the node administrator"""
+
+    allow_min: bool
+    allow_max: bool
+    allow_count: bool
+    allow_sum: bool
+    allow_missing: bool
+    allow_variance: bool
+    allow_counts_unique_values: bool
+    allow_num_complete_rows: bool
+    min_rows: int
+    privacy_threshold: int
+    allowed_columns: frozenset[str] | None
+    disallowed_columns: frozenset[str] | None
+
+
+def get_policy() -> Policy:
+    """
+    Read the privacy policies from the environment variables
+
+    Returns
+    -------
+    Policy
+        The privacy policies. Read these once per computation and pass them on, so
+        that the environment variables are not parsed again for every check.
+    """
+    return Policy(
+        **{
+            env_var.name.lower(): get_env_var(
+                env_var.value, default="true", as_type="bool"
+            )
+            for env_var in EnvVarsAllowed
+        },
+        min_rows=get_env_var(
+            ENVVAR_MINIMUM_ROWS, default=DEFAULT_MINIMUM_ROWS, as_type="int"
+        ),
+        privacy_threshold=get_env_var(
+            ENVVAR_PRIVACY_THRESHOLD, default=DEFAULT_PRIVACY_THRESHOLD, as_type="int"
+        ),
+        allowed_columns=_parse_columns(get_env_var(ENVVAR_ALLOWED_COLUMNS)),
+        disallowed_columns=_parse_columns(get_env_var(ENVVAR_DISALLOWED_COLUMNS)),
+    )
+
+
+def _parse_columns(columns: str | None) -> frozenset[str] | None:
+    """
+    Parse a comma-separated list of columns from an environment variable
+
+    Parameters
+    ----------
+    columns : str | None
+        The value of the environment variable
+
+    Returns
+    -------
+    frozenset[str] | None
+        The column names, stripped of surrounding whitespace, or None if the
+        environment variable is not set. A value that is set but contains no column
+        names yields an empty set, so that a malformed allow-list blocks all columns
+        instead of allowing them
+    """
+    if not columns:
+        return None
+    return frozenset(col.strip() for col in columns.split(",") if col.strip())
+
+
+def check_columns_exist(df: pd.DataFrame, columns: list[str]) -> None:
+    """
+    Check that the requested columns exist in the data
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The data to check
+    columns : list[str]
+        The columns that are requested in the computation
+    """
+    non_existing_columns = set(columns).difference(df.columns)
+    if non_existing_columns:
+        # report the columns in the requested order, as column labels of mixed types
+        # cannot be sorted
+        raise InputError(
+            f"Columns {[col for col in columns if col in non_existing_columns]} do "
+            "not exist in the dataframe"
+        )
+
+
+def check_privacy(
+    df: pd.DataFrame, requested_columns: list[str], policy: Policy
+) -> None:
     """
     Check if the data complies with the privacy settings
 
@@ -22,44 +118,55 @@ def check_privacy(df: pd.DataFrame, requested_columns: list[str]) -> None:
         The data to check
     requested_columns : list[str]
         The columns that are requested in the computation
+    policy : Policy
+        The privacy policies of the node
     """
-    min_rows = get_env_var(
-        ENVVAR_MINIMUM_ROWS, default=DEFAULT_MINIMUM_ROWS, as_type="int"
-    )
-    if len(df) < min_rows:
+    min_rows = policy.min_rows
+    if df.shape[0] < min_rows:
         raise PrivacyThresholdViolation(
             f"Data contains less than {min_rows} rows. Refusing to "
             "handle this computation, as it may lead to privacy issues."
         )
     # check that each column has at least min_rows non-null values
-    for col in df.columns:
-        if df[col].count() < min_rows:
-            raise PrivacyThresholdViolation(
-                f"Column {col} contains less than {min_rows} non-null values. "
-                "Refusing to handle this computation, as it may lead to privacy issues."
-            )
+    counts = df.count()
+    too_few_values = counts[counts < min_rows]
+    if not too_few_values.empty:
+        raise PrivacyThresholdViolation(
+            f"Columns {too_few_values.index.tolist()} contain less than {min_rows} "
+            "non-null values. Refusing to handle this computation, as it may lead to "
+            "privacy issues."
+        )
 
     # Check if requested columns are allowed
-    allowed_columns = get_env_var(ENVVAR_ALLOWED_COLUMNS)
-    if allowed_columns:
-        allowed_columns = allowed_columns.split(",")
-        for col in requested_columns:
-            if col not in allowed_columns:
-                raise ValueError(
-                    f"The node administrator does not allow '{col}' to be requested in "
-                    "this algorithm computation. Please contact the node administrator "
-                    "for more information."
-                )
-    non_allowed_collumns = get_env_var(ENVVAR_DISALLOWED_COLUMNS)
-    if non_allowed_collumns:
-        non_allowed_collumns = non_allowed_collumns.split(",")
-        for col in requested_columns:
-            if col in non_allowed_collumns:
-                raise ValueError(
-                    f"The node administrator does not allow '{col}' to be requested in "
-                    "this algorithm computation. Please contact the node administrator "
-                    "for more information."
-                )
+    if policy.allowed_columns is not None and not policy.allowed_columns.issuperset(
+        requested_columns
+    ):
+        _raise_columns_not_allowed(
+            [col for col in requested_columns if col not in policy.allowed_columns]
+        )
+    if (
+        policy.disallowed_columns is not None
+        and not policy.disallowed_columns.isdisjoint(requested_columns)
+    ):
+        _raise_columns_not_allowed(
+            [col for col in requested_columns if col in policy.disallowed_columns]
+        )
+
+
+def _raise_columns_not_allowed(columns: list[str]) -> None:
+    """
+    Raise an error for columns that the node administrator does not allow
+
+    Parameters
+    ----------
+    columns : list[str]
+        The requested columns that are not allowed
+    """
+    raise ValueError(
+        f"The node administrator does not allow {columns} to be requested in "
+        "this algorithm computation. Please contact the node administrator "
+        "for more information."
+    )
 
 
 def check_match_inferred_is_numeric(
@@ -86,34 +193,29 @@ def check_match_inferred_is_numeric(
         raise ValueError(
             "Length of is_numeric list does not match the length of columns list"
         )
-    if not all(
-        [is_numeric[i] == inferred_is_numeric[i] for i in range(len(is_numeric))]
-    ):
-        # check which columns do not match
-        wrongly_numeric_columns = [
-            columns[i]
-            for i in range(len(columns))
-            if is_numeric[i] and not inferred_is_numeric[i]
-        ]
-        wrongly_non_numeric_columns = [
-            columns[i]
-            for i in range(len(columns))
-            if not is_numeric[i] and inferred_is_numeric[i]
-        ]
-        msg = ""
-        if wrongly_numeric_columns:
-            # try to cast the columns to numeric
-            try:
-                df = cast_df_to_numeric(df, wrongly_numeric_columns)
-            except ValueError as exc:
-                msg += str(exc)
-        if wrongly_non_numeric_columns:
-            msg += (
-                f"Columns {wrongly_non_numeric_columns} are numeric, but is_numeric is "
-                "set to False"
-            )
-        if msg:
-            raise ValueError(msg)
+    if list(is_numeric) == list(inferred_is_numeric):
+        # the usual case: nothing has to be cast
+        return df
+    is_numeric = np.asarray(is_numeric, dtype=bool)
+    inferred_is_numeric = np.asarray(inferred_is_numeric, dtype=bool)
+    # check which columns do not match
+    columns = np.asarray(columns, dtype=object)
+    wrongly_numeric_columns = columns[is_numeric & ~inferred_is_numeric].tolist()
+    wrongly_non_numeric_columns = columns[~is_numeric & inferred_is_numeric].tolist()
+    msg = ""
+    if wrongly_numeric_columns:
+        # try to cast the columns to numeric
+        try:
+            df = cast_df_to_numeric(df, wrongly_numeric_columns)
+        except ValueError as exc:
+            msg += str(exc)
+    if wrongly_non_numeric_columns:
+        msg += (
+            f"Columns {wrongly_non_numeric_columns} are numeric, but is_numeric is "
+            "set to False"
+        )
+    if msg:
+        raise ValueError(msg)
     return df
 
 
@@ -133,13 +235,46 @@ def cast_df_to_numeric(
     Returns
     -------
     pd.DataFrame
-        The dataframe with the columns cast to numeric
+        The dataframe with the columns cast to numeric. The input dataframe is not
+        modified: it is copied if any of the columns have to be cast
     """
     if columns is None:
         columns = df.columns
+    # convert all columns first, so that the dataframe is only copied if there is
+    # something to cast and all failing columns are reported at once
+    converted = {}
+    failed_columns = []
     for col in columns:
+        if is_numeric_dtype(df[col]):
+            # nothing to convert
+            continue
         try:
-            df[col] = pd.to_numeric(df[col])
-        except ValueError as exc:
-            raise ValueError(f"Column {col} could not be cast to numeric") from exc
+            converted[col] = pd.to_numeric(df[col])
+        except ValueError:
+            failed_columns.append(col)
+    if failed_columns:
+        raise ValueError(f"Columns {failed_columns} could not be cast to numeric")
+    if not converted:
+        return df
+    df = df.copy()
+    for col, values in converted.items():
+        df[col] = values
     return df
+
+
+def to_float_array(df: pd.DataFrame) -> np.ndarray:
+    """
+    Extract the data as a single float array to compute statistics on
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The numeric data to extract
+
+    Returns
+    -------
+    np.ndarray
+        Column-major float64 array of shape (n_rows, n_columns), so that the values of
+        each column are contiguous in memory. Missing values are NaN.
+    """
+    return np.asfortranarray(df.to_numpy(dtype=np.float64, na_value=np.nan))